@@ -0,0 +1,65 @@
+from blockchain.dto import BalanceProofDTO, BlockInclusionProofDTO
+from blockchain.handler import PersistentBlockchainHandler
+from fastapi import APIRouter, HTTPException, Request
+
+router = APIRouter()
+
+
+def get_blockchain(request: Request) -> PersistentBlockchainHandler:
+    """Returns the blockchain handler shared by the application."""
+    blockchain: PersistentBlockchainHandler = request.app.state.blockchain
+    return blockchain
+
+
+@router.get("/balances/{address}/proof", response_model=BalanceProofDTO)
+async def get_balance_proof(address: str, request: Request) -> BalanceProofDTO:
+    """Serves a balance proof for an address against the latest state root."""
+    return await get_blockchain(request).get_balance_proof(address)
+
+
+@router.get("/blocks/{block_hash}")
+async def get_block(block_hash: str, request: Request) -> dict:
+    """Serves a stored block by its hash."""
+    block_data = await get_blockchain(request).get_block(block_hash)
+    if not block_data:
+        raise HTTPException(status_code=404, detail="Block not found")
+    return block_data
+
+
+@router.get("/blocks/number/{block_number}")
+async def get_block_by_number(block_number: int, request: Request) -> dict:
+    """Serves a stored block by its height."""
+    block_data = await get_blockchain(request).get_block_by_number(block_number)
+    if not block_data:
+        raise HTTPException(status_code=404, detail="Block not found")
+    return block_data
+
+
+@router.get("/blocks/{block_hash}/transactions/{tx_hash}/proof")
+async def get_transaction_proof(block_hash: str, tx_hash: str, request: Request) -> list[tuple[str, str]]:
+    """Serves a Merkle Proof for a transaction in a stored block."""
+    proof = await get_blockchain(request).get_transaction_proof(block_hash, tx_hash)
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return proof
+
+
+@router.get("/chain/root")
+async def get_chain_root(request: Request) -> dict[str, str | None]:
+    """Serves the commitment to all stored block hashes."""
+    return {"chainRoot": get_blockchain(request).get_chain_root()}
+
+
+@router.get("/blocks/{block_hash}/inclusion-proof", response_model=BlockInclusionProofDTO)
+async def get_block_inclusion_proof(block_hash: str, request: Request) -> BlockInclusionProofDTO:
+    """Serves a proof that a block belongs to the chain."""
+    proof = await get_blockchain(request).get_block_inclusion_proof(block_hash)
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Block not found")
+    return proof
+
+
+@router.get("/metrics/cache")
+async def get_cache_metrics(request: Request) -> dict[str, float]:
+    """Serves hit ratio and eviction metrics of the KeyDB client-side cache."""
+    return get_blockchain(request).db.cache_stats()
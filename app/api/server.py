@@ -0,0 +1,24 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from blockchain.handler import PersistentBlockchainHandler
+from db.keydb_client import KeyDBClient
+from fastapi import FastAPI
+
+from .handler import router
+
+CACHE_SIZE = 10_000
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Opens the blockchain for the lifetime of the application."""
+    keydb_client = KeyDBClient(cache_size=CACHE_SIZE)
+    await keydb_client.start_tracking()
+    async with PersistentBlockchainHandler(keydb_client) as blockchain:
+        app.state.blockchain = blockchain
+        yield
+
+
+app = FastAPI(title="Blockchain playground", lifespan=lifespan)
+app.include_router(router)
@@ -1,7 +1,20 @@
 """Blockchain package."""
 
-from .dto import BlockDTO, TransactionDTO
+from .bloom_filter import BloomFilter
+from .dto import BalanceProofDTO, BlockDTO, BlockInclusionProofDTO, TransactionDTO
 from .handler import Block
 from .merkle_tree import MerkleTree
+from .mountain_range import MerkleMountainRange
+from .sparse_merkle_tree import SparseMerkleTree
 
-__all__ = ["BlockDTO", "TransactionDTO", "Block", "MerkleTree"]
+__all__ = [
+    "BalanceProofDTO",
+    "BlockDTO",
+    "BlockInclusionProofDTO",
+    "TransactionDTO",
+    "Block",
+    "BloomFilter",
+    "MerkleTree",
+    "MerkleMountainRange",
+    "SparseMerkleTree",
+]
@@ -0,0 +1,123 @@
+import base64
+import json
+import zlib
+from collections import OrderedDict
+from typing import NamedTuple
+
+from db.keydb_client import KeyDBClient
+
+
+class BlockHeader(NamedTuple):
+    """What the in-memory chain keeps of an archived block."""
+
+    block_hash: str
+    block_number: int
+    state_root: str | None
+
+
+class BlockArchive:
+    """
+    Block Archive keeps old blocks as compressed segments in KeyDB
+    each segment holds SEGMENT_SIZE consecutive blocks of the chain
+    the blocks' JSON is concatenated and zlib-compressed into one value
+    a small offset index tells where each block starts inside the segment
+    and holds the block headers, so the chain can be loaded without decompressing
+    recently read segments are kept decompressed in a bounded LRU cache
+    """
+
+    PREFIX = "archive:"
+    SEGMENT_SIZE = 64
+
+    def __init__(self, keydb_client: KeyDBClient, segment_size: int | None = None, cache_size: int = 8) -> None:
+        """Without segment_size, the size stored in KeyDB or SEGMENT_SIZE is used."""
+        self.db = keydb_client
+        self._requested_segment_size = segment_size
+        self.segment_size: int = segment_size or self.SEGMENT_SIZE
+        self.cache_size = cache_size
+        self.segment_count: int = 0
+        # segment id -> (decompressed blocks, block hash -> (start, end))
+        self._segments: OrderedDict[int, tuple[bytes, dict[str, tuple[int, int]]]] = OrderedDict()
+
+    @property
+    def archived_count(self) -> int:
+        """Number of blocks from the start of the chain that live in segments."""
+        return self.segment_count * self.segment_size
+
+    async def load(self) -> None:
+        """
+        Loads the number of written segments and their size from KeyDB.
+        Positions depend on the segment size, so a conflicting one raises ValueError.
+        """
+        count = await self.db.get(f"{self.PREFIX}segments")
+        self.segment_count = int(count) if count else 0
+        stored_size = await self.db.get(f"{self.PREFIX}segment_size")
+        if not stored_size:
+            return
+        if self._requested_segment_size is not None and self._requested_segment_size != int(stored_size):
+            raise ValueError(f"Archive segments were written with segment_size={stored_size}, got {self._requested_segment_size}")
+        self.segment_size = int(stored_size)
+
+    async def load_headers(self) -> list[BlockHeader]:
+        """Returns the headers of all archived blocks in chain order, read from the offset indexes."""
+        if not self.segment_count:
+            return []
+        indexes = await self.db.mget([f"{self.PREFIX}index:{segment_id}" for segment_id in range(self.segment_count)])
+        return [
+            BlockHeader(block_hash, block_number, state_root)
+            for index_data in indexes
+            if index_data
+            for block_hash, block_number, state_root, _, _ in json.loads(index_data)
+        ]
+
+    async def write_segment(self, blocks: list[tuple[BlockHeader, str]]) -> int:
+        """Compresses (block header, block JSON) pairs into the next segment and returns its id."""
+        segment_id = self.segment_count
+        data = bytearray()
+        index: list[tuple[str, int, str | None, int, int]] = []
+        for header, block_json in blocks:
+            encoded = block_json.encode()
+            index.append((*header, len(data), len(data) + len(encoded)))
+            data.extend(encoded)
+
+        # Stored as text since the client decodes every response
+        compressed = base64.b64encode(zlib.compress(bytes(data), level=9)).decode()
+        await self.db.mset(
+            {
+                f"{self.PREFIX}segment:{segment_id}": compressed,
+                f"{self.PREFIX}index:{segment_id}": json.dumps(index),
+                f"{self.PREFIX}segments": str(segment_id + 1),
+                f"{self.PREFIX}segment_size": str(self.segment_size),
+            }
+        )
+        self.segment_count = segment_id + 1
+        return segment_id
+
+    async def _load_segment(self, segment_id: int) -> tuple[bytes, dict[str, tuple[int, int]]] | None:
+        if segment_id in self._segments:
+            self._segments.move_to_end(segment_id)
+            return self._segments[segment_id]
+
+        compressed = await self.db.get(f"{self.PREFIX}segment:{segment_id}", immutable=True)
+        index_data = await self.db.get(f"{self.PREFIX}index:{segment_id}", immutable=True)
+        if not compressed or not index_data:
+            return None
+        data = zlib.decompress(base64.b64decode(compressed))
+        offsets = {block_hash: (start, end) for block_hash, _, _, start, end in json.loads(index_data)}
+
+        self._segments[segment_id] = (data, offsets)
+        while len(self._segments) > self.cache_size:
+            self._segments.popitem(last=False)
+        return data, offsets
+
+    async def get(self, position: int, block_hash: str) -> str | None:
+        """Returns the JSON of an archived block by its position in the chain."""
+        if position >= self.archived_count:
+            return None
+        segment = await self._load_segment(position // self.segment_size)
+        if segment is None:
+            return None
+        data, offsets = segment
+        if block_hash not in offsets:
+            return None
+        start, end = offsets[block_hash]
+        return data[start:end].decode()
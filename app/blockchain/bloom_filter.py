@@ -0,0 +1,45 @@
+import hashlib
+
+
+class BloomFilter:
+    """
+    Bloom Filter is a fixed-size bit array answering "might this item be in the set?"
+    each item is hashed using SHA-256 and sets HASH_COUNT bits of the array
+    an item is possibly present only if all of its bits are set
+    false positives are possible, false negatives are not
+    """
+
+    SIZE = 2048  # bits
+    HASH_COUNT = 3
+
+    def __init__(self, items: list[str] | None = None, bits: int = 0) -> None:
+        self.bits: int = bits
+        for item in items or []:
+            self.add(item)
+
+    @classmethod
+    def mask_for(cls, item: str) -> int:
+        """Returns the bits an item sets in the filter."""
+        digest = hashlib.sha256(item.encode()).digest()
+        mask = 0
+        # Each pair of bytes picks one bit, like Ethereum's logsBloom
+        for i in range(cls.HASH_COUNT):
+            mask |= 1 << (int.from_bytes(digest[2 * i : 2 * i + 2], "big") % cls.SIZE)
+        return mask
+
+    def add(self, item: str) -> None:
+        self.bits |= self.mask_for(item)
+
+    def might_contain(self, item: str) -> bool:
+        mask = self.mask_for(item)
+        return self.bits & mask == mask
+
+    def to_hex(self) -> str:
+        return format(self.bits, f"0{self.SIZE // 4}x")
+
+    @classmethod
+    def from_hex(cls, data: str) -> "BloomFilter":
+        return cls(bits=int(data, 16))
+
+    def __repr__(self) -> str:
+        return f"BloomFilter(Bits set: {bin(self.bits).count('1')})"
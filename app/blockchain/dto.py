@@ -25,6 +25,7 @@ class BlockDTO(BaseModel):
     transactions: list[TransactionDTO] = Field(default_factory=list)
     gas_used: int = Field(alias="gasUsed")
     gas_limit: int = Field(alias="gasLimit")
+    state_root: str | None = Field(default=None, alias="stateRoot")
 
     class Config:
         populate_by_name = True
@@ -38,3 +39,27 @@ class TokenBalanceDTO(BaseModel):
 
     class Config:
         populate_by_name = True
+
+
+class BalanceProofDTO(BaseModel):
+    address: str
+    balance: str | None
+    state_root: str = Field(alias="stateRoot")
+    siblings: list[str] = Field(default_factory=list)
+    bitmap: str
+
+    class Config:
+        populate_by_name = True
+
+
+class BlockInclusionProofDTO(BaseModel):
+    block_hash: str = Field(alias="blockHash")
+    leaf_index: int = Field(alias="leafIndex")
+    siblings: list[tuple[str, str]] = Field(default_factory=list)
+    peaks: list[str]
+    peak_index: int = Field(alias="peakIndex")
+    chain_size: int = Field(alias="chainSize")
+    chain_root: str = Field(alias="chainRoot")
+
+    class Config:
+        populate_by_name = True
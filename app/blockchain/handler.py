@@ -1,13 +1,19 @@
 import hashlib
 import json
 from datetime import datetime
+from decimal import Decimal
 from typing import Optional
 
 from db.keydb_client import KeyDBClient
 
-from .dto import BlockDTO, TransactionDTO
+from .archive import BlockArchive, BlockHeader
+from .bloom_filter import BloomFilter
+from .dto import BalanceProofDTO, BlockDTO, BlockInclusionProofDTO, TransactionDTO
 from .merkle_tree import MerkleTree
 from .models import BlockModel
+from .mountain_range import MerkleMountainRange
+from .single_flight import SingleFlight
+from .sparse_merkle_tree import SparseMerkleTree
 
 
 class Block:
@@ -24,6 +30,12 @@ class Block:
         self.gas_used: int = block_dto.gas_used
         self.gas_limit: int = block_dto.gas_limit
         self.transactions: list[TransactionDTO] = block_dto.transactions
+        # Root of the account state after this block, set when the block is stored
+        self.state_root: str | None = block_dto.state_root
+        # Bloom filter over addresses and tx hashes for pre-filtering block queries
+        self.bloom_filter: BloomFilter = BloomFilter(
+            [item for tx in self.transactions for item in (tx.from_address, tx.to_address, tx.tx_hash)]
+        )
 
     def _transaction_to_string(self, tx: TransactionDTO) -> str:
         """Convert a TransactionDTO to a consistent string representation."""
@@ -56,10 +68,29 @@ class Block:
 
 
 class PersistentBlockchainHandler:
-    def __init__(self, keydb_client: Optional[KeyDBClient] = None) -> None:
-        """Initialize KeyDB client."""
+    BLOOM_BATCH_SIZE = 256
+
+    def __init__(
+        self,
+        keydb_client: Optional[KeyDBClient] = None,
+        request_ttl: float = 1.0,
+        archive_depth: int | None = None,
+        segment_size: int | None = None,
+    ) -> None:
+        """
+        Initialize KeyDB client.
+        Blocks deeper than archive_depth are moved into compressed archive segments,
+        None keeps every block as a full JSON value.
+        """
         self.db = keydb_client or KeyDBClient()
-        self.chain: list[Block] = []
+        # Archived heights keep only their header, the full block stays in its segment
+        self.chain: list[Block | BlockHeader] = []
+        self.state_tree: SparseMerkleTree = SparseMerkleTree(self.db)
+        self.block_mmr: MerkleMountainRange = MerkleMountainRange(self.db)
+        # Concurrent reads of the same block or proof share one lookup
+        self._requests: SingleFlight = SingleFlight(ttl=request_ttl)
+        self.archive_depth = archive_depth
+        self.archive: BlockArchive = BlockArchive(self.db, segment_size=segment_size)
 
     async def initialize(self) -> None:
         """Initialize the blockchain by loading existing chain data."""
@@ -76,39 +107,218 @@ class PersistentBlockchainHandler:
 
     async def store_block(self, block: Block) -> None:
         """Stores a block in KeyDB and adds it to the in-memory chain."""
+        balance_changes = await self._get_balance_changes(block)
+        block.state_root = await self.state_tree.update(balance_changes)
         block_model = BlockModel.model_validate(block)
         await self.db.set(block.block_hash, block_model.model_dump_json())
+        # Stored next to the block so queries can skip blocks without fetching them
+        await self.db.set(f"bloom:{block.block_hash}", block.bloom_filter.to_hex())
         self.chain.append(block)
         # Store only block hashes in KeyDB for chain reconstruction
         chain_hashes = [block.block_hash for block in self.chain]
         await self.db.set("blockchain_chain", json.dumps(chain_hashes))
+        await self.block_mmr.append(block.block_hash)
+        # Lookups that just missed this block must not keep returning nothing
+        self._requests.forget(("hash", block.block_hash))
+        self._requests.forget(("block", block.block_hash))
+        for tx in block.transactions:
+            self._requests.forget(("proof", block.block_hash, tx.tx_hash))
+        await self._archive_old_blocks()
+
+    async def _archive_old_blocks(self) -> None:
+        """Moves full segments of blocks deeper than archive_depth out of the hot keys."""
+        if self.archive_depth is None:
+            return
+        segment_size = self.archive.segment_size
+        while len(self.chain) - self.archive.archived_count - self.archive_depth >= segment_size:
+            start = self.archive.archived_count
+            headers = [
+                BlockHeader(block.block_hash, block.block_number, block.state_root)
+                for block in self.chain[start : start + segment_size]
+            ]
+            block_data = await self.db.mget([header.block_hash for header in headers])
+            # Positions in the archive follow the chain, a short segment would shift every later block
+            missing = [header.block_hash for header, data in zip(headers, block_data) if not data]
+            if missing:
+                raise KeyError(f"Missing blocks {missing} can't be archived")
+            await self.archive.write_segment(list(zip(headers, block_data)))
+            self.chain[start : start + segment_size] = headers
+            # Hot copies are dropped only once the segment is written
+            await self.db.delete_many([header.block_hash for header in headers])
 
     async def load_chain(self) -> None:
-        """Loads the blockchain from KeyDB and reconstructs Block objects."""
+        """
+        Loads the blockchain from KeyDB and reconstructs Block objects.
+        Archived blocks are loaded as headers, their segments stay compressed until read.
+        """
+        await self.block_mmr.load()
+        await self.archive.load()
         chain_data = await self.db.get("blockchain_chain")
         if chain_data:
             block_hashes = json.loads(chain_data)
-            self.chain = []
-            for block_hash in block_hashes:
+            self.chain = list(await self.archive.load_headers())
+            for block_hash in block_hashes[self.archive.archived_count :]:
                 block_data = await self.get_block(block_hash)
                 if block_data:
-                    block_model = BlockModel.model_validate(block_data)
-                    block_dto = BlockDTO(
-                        timestamp=block_model.timestamp,
-                        parent_hash=block_model.prev_hash,
-                        transactions=block_model.transactions,
-                        block_number=block_model.block_number,
-                        block_hash=block_model.block_hash,
-                        gas_used=block_model.gas_used,
-                        gas_limit=block_model.gas_limit,
-                    )
-                    self.chain.append(Block(block_dto))
+                    self.chain.append(self._block_from_data(block_data))
+            if self.chain and self.chain[-1].state_root:
+                self.state_tree.root = self.chain[-1].state_root
+        # Chains stored before the mountain range existed are appended once
+        for block in self.chain[self.block_mmr.size :]:
+            await self.block_mmr.append(block.block_hash)
+
+    def _block_from_data(self, block_data: dict) -> Block:
+        """Reconstructs a Block from its stored data."""
+        block_model = BlockModel.model_validate(block_data)
+        block_dto = BlockDTO(
+            timestamp=block_model.timestamp,
+            parent_hash=block_model.prev_hash,
+            transactions=block_model.transactions,
+            block_number=block_model.block_number,
+            block_hash=block_model.block_hash,
+            gas_used=block_model.gas_used,
+            gas_limit=block_model.gas_limit,
+            state_root=block_model.state_root,
+        )
+        return Block(block_dto)
 
     async def get_block(self, block_hash: str) -> dict:
-        """Retrieves a block from KeyDB by its hash."""
-        block_data = await self.db.get(block_hash)
+        """
+        Retrieves a block from KeyDB by its hash.
+        Concurrent callers share the same lookup and the same returned dict.
+        """
+        return await self._requests.do(("hash", block_hash), lambda: self._fetch_block(block_hash))
+
+    async def _fetch_block(self, block_hash: str) -> dict:
+        # Stored blocks never change, so they can stay in the client-side cache
+        block_data = await self.db.get(block_hash, immutable=True)
+        if block_data is None and self.archive.segment_count:
+            # Not a hot key anymore, read through to its archive segment
+            position = await self.block_mmr.get_leaf_index(block_hash)
+            if position is not None:
+                block_data = await self.archive.get(position, block_hash)
         return json.loads(block_data) if block_data else {}
 
+    async def get_block_by_number(self, block_number: int) -> dict:
+        """Retrieves a block from KeyDB by its height."""
+        for block in self.chain:
+            if block.block_number == block_number:
+                return await self.get_block(block.block_hash)
+        return {}
+
+    async def get_transaction_proof(self, block_hash: str, tx_hash: str) -> list[tuple[str, str]] | None:
+        """
+        Generates a Merkle Proof for a transaction in a stored block.
+        Concurrent callers share the rebuilt Block and the computed proof.
+        """
+        return await self._requests.do(("proof", block_hash, tx_hash), lambda: self._build_transaction_proof(block_hash, tx_hash))
+
+    async def _build_transaction_proof(self, block_hash: str, tx_hash: str) -> list[tuple[str, str]] | None:
+        block = await self._requests.do(("block", block_hash), lambda: self._load_block(block_hash))
+        if block is None:
+            return None
+        for tx in block.transactions:
+            if tx.tx_hash == tx_hash:
+                return block.merkle_tree.get_merkle_proof(block._transaction_to_string(tx))
+        return None
+
+    async def _load_block(self, block_hash: str) -> Block | None:
+        block_data = await self.get_block(block_hash)
+        return self._block_from_data(block_data) if block_data else None
+
+    async def _get_bloom_candidates(self, item: str, from_block: int, to_block: int | None) -> list[str]:
+        """Returns hashes of blocks in the range whose Bloom filter might contain the item."""
+        block_hashes = [
+            block.block_hash
+            for block in self.chain
+            if block.block_number >= from_block and (to_block is None or block.block_number <= to_block)
+        ]
+        mask = BloomFilter.mask_for(item)
+        candidates: list[str] = []
+        # Blocks stored without a Bloom filter are always candidates
+        for i in range(0, len(block_hashes), self.BLOOM_BATCH_SIZE):
+            batch = block_hashes[i : i + self.BLOOM_BATCH_SIZE]
+            blooms = await self.db.mget([f"bloom:{block_hash}" for block_hash in batch])
+            candidates.extend(
+                block_hash for block_hash, bloom in zip(batch, blooms) if bloom is None or int(bloom, 16) & mask == mask
+            )
+        return candidates
+
+    async def get_blocks_by_address(self, address: str, from_block: int = 0, to_block: int | None = None) -> list[dict]:
+        """Retrieves blocks in the range with transactions from or to the address."""
+        blocks: list[dict] = []
+        for block_hash in await self._get_bloom_candidates(address, from_block, to_block):
+            block_data = await self.get_block(block_hash)
+            if any(address in (tx["from_address"], tx["to_address"]) for tx in block_data.get("transactions", [])):
+                blocks.append(block_data)
+        return blocks
+
+    async def get_block_by_tx_hash(self, tx_hash: str) -> dict:
+        """Retrieves the block containing a transaction."""
+        for block_hash in await self._get_bloom_candidates(tx_hash, 0, None):
+            block_data = await self.get_block(block_hash)
+            if any(tx["tx_hash"] == tx_hash for tx in block_data.get("transactions", [])):
+                return block_data
+        return {}
+
+    async def _get_balance_changes(self, block: Block) -> dict[str, str | None]:
+        """Computes the new balances of all accounts touched by the block's transactions."""
+        balances: dict[str, Decimal] = {}
+        for tx in block.transactions:
+            for address in (tx.from_address, tx.to_address):
+                if address not in balances:
+                    balance = await self.state_tree.get(address)
+                    balances[address] = Decimal(balance) if balance is not None else Decimal(0)
+            value = Decimal(tx.value)
+            balances[tx.from_address] -= value
+            balances[tx.to_address] += value
+        return {address: str(balance) for address, balance in balances.items()}
+
+    async def get_balance(self, address: str) -> str | None:
+        """Returns the balance of an address at the chain tip."""
+        return await self.state_tree.get(address)
+
+    async def get_balance_proof(self, address: str) -> BalanceProofDTO:
+        """
+        Generates a balance proof for an address against the latest state root.
+        A missing balance makes it a non-inclusion proof.
+        """
+        balance, siblings, bitmap, state_root = await self.state_tree.get_proof(address)
+        return BalanceProofDTO(
+            address=address,
+            balance=balance,
+            state_root=state_root,
+            siblings=siblings,
+            bitmap=bitmap,
+        )
+
+    def get_chain_root(self) -> str | None:
+        """Returns the commitment to all stored block hashes."""
+        return self.block_mmr.get_root()
+
+    async def get_block_inclusion_proof(self, block_hash: str) -> BlockInclusionProofDTO | None:
+        """Generates a proof that a block belongs to the chain against the chain root."""
+        leaf_index = await self.block_mmr.get_leaf_index(block_hash)
+        if leaf_index is None:
+            return None
+        proof = await self.block_mmr.get_proof(leaf_index)
+        if proof is None:
+            return None
+        # Root and peaks come from the same snapshot the siblings were read against
+        siblings, peak_index, peaks, chain_size = proof
+        chain_root = MerkleMountainRange.bag_peaks(peaks)
+        if chain_root is None:
+            return None
+        return BlockInclusionProofDTO(
+            block_hash=block_hash,
+            leaf_index=leaf_index,
+            siblings=siblings,
+            peaks=peaks,
+            peak_index=peak_index,
+            chain_size=chain_size,
+            chain_root=chain_root,
+        )
+
     async def close(self) -> None:
         """Close the KeyDB connection pool."""
         await self.db.close()
@@ -32,6 +32,7 @@ class BlockModel(BaseModel):
     gas_used: int
     gas_limit: int
     transactions: List[TransactionDTO]
+    state_root: str | None = None
 
 
 class Block:
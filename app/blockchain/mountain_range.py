@@ -0,0 +1,139 @@
+import hashlib
+import json
+
+from db.keydb_client import KeyDBClient
+
+
+class MerkleMountainRange:
+    """
+    Merkle Mountain Range is an append-only list of perfect Merkle Trees (peaks)
+    each block hash is appended as a leaf, equal height peaks are merged right away
+    so appending costs amortised O(1) hashes and writes
+    a node at height h and index i covers leaves [i * 2^h, (i + 1) * 2^h)
+    the peaks are bagged from right to left into the -> Chain Root
+    """
+
+    PREFIX = "mmr:"
+
+    def __init__(self, keydb_client: KeyDBClient) -> None:
+        self.db = keydb_client
+        self.size: int = 0  # number of leaves
+        self.peaks: list[str] = []  # from the highest (leftmost) to the lowest
+
+    @staticmethod
+    def hash_function(data: str) -> str:
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _node_key(self, height: int, index: int) -> str:
+        return f"{self.PREFIX}node:{height}:{index}"
+
+    async def load(self) -> None:
+        """Loads size and peaks from KeyDB."""
+        data = await self.db.get(f"{self.PREFIX}peaks")
+        if data:
+            state = json.loads(data)
+            self.size, self.peaks = state["size"], state["peaks"]
+
+    async def append(self, block_hash: str) -> int:
+        """Appends a block hash and returns its leaf index."""
+        leaf_index = self.size
+        peaks = list(self.peaks)
+        current_hash = self.hash_function(block_hash)
+        writes = {self._node_key(0, leaf_index): current_hash}
+
+        # Every trailing 1 bit of the index is a peak of the same height to merge with
+        height, index = 0, leaf_index
+        while index & 1:
+            current_hash = self.hash_function(peaks.pop() + current_hash)
+            height, index = height + 1, index // 2
+            writes[self._node_key(height, index)] = current_hash
+        peaks.append(current_hash)
+
+        writes[f"{self.PREFIX}index:{block_hash}"] = str(leaf_index)
+        writes[f"{self.PREFIX}peaks"] = json.dumps({"size": leaf_index + 1, "peaks": peaks})
+        await self.db.mset(writes)
+        # Readers never see a half-merged range, size and peaks change together
+        self.size, self.peaks = leaf_index + 1, peaks
+        return leaf_index
+
+    @classmethod
+    def bag_peaks(cls, peaks: list[str]) -> str | None:
+        """Combines peaks from right to left into a single root."""
+        if not peaks:
+            return None
+        root = peaks[-1]
+        for peak in reversed(peaks[:-1]):
+            root = cls.hash_function(peak + root)
+        return root
+
+    def get_root(self) -> str | None:
+        """Returns the commitment to the whole chain."""
+        return self.bag_peaks(self.peaks)
+
+    async def get_leaf_index(self, block_hash: str) -> int | None:
+        index = await self.db.get(f"{self.PREFIX}index:{block_hash}")
+        return int(index) if index is not None else None
+
+    @staticmethod
+    def peak_of(leaf_index: int, size: int) -> tuple[int, int]:
+        """Returns the index and height of the peak covering a leaf in a range of given size."""
+        # Peaks follow the set bits of the size, from the highest one
+        peak_index, first_leaf = 0, 0
+        for height in range(size.bit_length() - 1, -1, -1):
+            if not size & (1 << height):
+                continue
+            if leaf_index < first_leaf + (1 << height):
+                break
+            first_leaf += 1 << height
+            peak_index += 1
+        return peak_index, height
+
+    @staticmethod
+    def _direction(leaf_index: int, level: int) -> str:
+        return "left" if (leaf_index >> level) & 1 else "right"
+
+    async def get_proof(self, leaf_index: int) -> tuple[list[tuple[str, str]], int, list[str], int] | None:
+        """
+        Generates an inclusion proof for a leaf against the current peaks.
+        Returns a list of (sibling hash, direction) tuples up to the leaf's peak,
+        the index of that peak, and the peaks and size the proof was built against.
+        """
+        # Appends may land while the siblings are fetched, the proof sticks to this snapshot
+        size, peaks = self.size, self.peaks
+        if not 0 <= leaf_index < size:
+            return None
+
+        peak_index, height = self.peak_of(leaf_index, size)
+        sibling_keys = [self._node_key(level, (leaf_index >> level) ^ 1) for level in range(height)]
+        directions = [self._direction(leaf_index, level) for level in range(height)]
+        siblings = await self.db.mget(sibling_keys) if sibling_keys else []
+        return list(zip(siblings, directions)), peak_index, peaks, size
+
+    @classmethod
+    def verify_proof(
+        cls, block_hash: str, proof: list[tuple[str, str]], peaks: list[str], leaf_index: int, size: int, root: str
+    ) -> bool:
+        """
+        Verifies an inclusion proof by reconstructing the peak and bagging the peaks.
+        The path must lead from the leaf's position all the way up to its peak,
+        so an internal node can't be passed off as a block hash with a shorter proof.
+        Needs no storage, so light clients can call it on the class.
+        """
+        if not 0 <= leaf_index < size or len(peaks) != bin(size).count("1"):
+            return False
+        peak_index, height = cls.peak_of(leaf_index, size)
+        if len(proof) != height:
+            return False
+
+        current_hash = cls.hash_function(block_hash)
+        for level, (sibling_hash, direction) in enumerate(proof):
+            if direction != cls._direction(leaf_index, level):
+                return False
+            if direction == "left":
+                current_hash = cls.hash_function(sibling_hash + current_hash)
+            else:
+                current_hash = cls.hash_function(current_hash + sibling_hash)
+
+        if peaks[peak_index] != current_hash:
+            return False
+        return cls.bag_peaks(peaks) == root
@@ -0,0 +1,61 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Single flight coalesces concurrent calls for the same key
+    the first caller starts the work, later callers await the same task
+    a successful result is kept for a short TTL, errors are never kept
+    cancelling one caller doesn't cancel the work for the others
+    """
+
+    def __init__(self, ttl: float = 1.0) -> None:
+        self.ttl = ttl
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        # key -> (result, expiry timestamp), in expiry order since the TTL is fixed
+        self._results: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Returns the result of fn(), shared with every concurrent caller of the same key."""
+        self._purge_expired()
+        if key in self._results:
+            result: T = self._results[key][0]
+            return result
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        # Retrieving the exception also marks it as handled when nobody awaits anymore
+        if task.cancelled() or task.exception() is not None:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+            return
+        # A flight forgotten while running keeps its result to its own callers
+        if self._in_flight.get(key) is not task:
+            return
+        del self._in_flight[key]
+        self._results[key] = (task.result(), time.monotonic() + self.ttl)
+        self._results.move_to_end(key)
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        while self._results:
+            key, (_, expires_at) = next(iter(self._results.items()))
+            if expires_at > now:
+                break
+            del self._results[key]
+
+    def forget(self, key: Hashable) -> None:
+        """Drops the cached result for key, a flight still running won't be cached either."""
+        self._results.pop(key, None)
+        self._in_flight.pop(key, None)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+from db.keydb_client import KeyDBClient
+
+# A node record is either an internal node ["n", left_hash, right_hash]
+# or a leaf shortcut ["l", key, value] standing in for a subtree holding a single leaf
+NodeRecord = list[str]
+
+
+def _hash(data: str) -> str:
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _empty_hashes(depth: int) -> list[str]:
+    """Returns the hash of an empty subtree for every height up to depth."""
+    empty_hashes = [_hash("")]
+    for _ in range(depth):
+        empty_hashes.append(_hash(empty_hashes[-1] * 2))
+    return empty_hashes
+
+
+class SparseMerkleTree:
+    """
+    Sparse Merkle Tree is a Merkle Tree over the whole 256-bit key space
+    each account is stored at the leaf addressed by the SHA-256 hash of its address
+    empty subtrees are never stored, their hashes are precomputed per height
+    a subtree holding a single leaf is stored as one leaf shortcut record
+    so only O(log n) nodes are stored and read per account
+    only the latest state is kept, nodes replaced by an update are deleted
+    the final hash is the -> State Root
+    """
+
+    DEPTH = 256
+    NODE_PREFIX = "smt:"
+    # EMPTY_HASHES[h] is the hash of an empty subtree of height h
+    EMPTY_HASHES: list[str] = _empty_hashes(DEPTH)
+
+    def __init__(self, keydb_client: KeyDBClient, root: str | None = None, cache_size: int = 10_000) -> None:
+        self.db = keydb_client
+        self.cache_size = cache_size
+        self.root: str = root or self.EMPTY_HASHES[self.DEPTH]
+        # Write-back cache: dirty nodes are kept in memory until flush()
+        self._dirty: dict[str, NodeRecord] = {}
+        # Nodes no longer referenced by the root, deleted on flush()
+        self._orphans: set[str] = set()
+        self._cache: OrderedDict[str, NodeRecord] = OrderedDict()
+
+    @staticmethod
+    def hash_function(data: str) -> str:
+        return _hash(data)
+
+    @staticmethod
+    def key_for(address: str) -> str:
+        """Returns the leaf key of an address."""
+        return _hash(address)
+
+    @staticmethod
+    def leaf_hash(key: str, value: str) -> str:
+        return _hash(key + value)
+
+    def subtree_hash(self, key: str, value: str, height: int) -> str:
+        """Returns the hash of a subtree of given height holding a single leaf."""
+        path = int(key, 16)
+        current_hash = self.leaf_hash(key, value)
+        for level in range(height):
+            if (path >> level) & 1:
+                current_hash = self.hash_function(self.EMPTY_HASHES[level] + current_hash)
+            else:
+                current_hash = self.hash_function(current_hash + self.EMPTY_HASHES[level])
+        return current_hash
+
+    async def _load(self, node_hash: str, height: int) -> NodeRecord | None:
+        """Returns the node record for a hash, None for an empty subtree."""
+        if node_hash == self.EMPTY_HASHES[height]:
+            return None
+        if node_hash in self._dirty:
+            return self._dirty[node_hash]
+        if node_hash in self._cache:
+            self._cache.move_to_end(node_hash)
+            return self._cache[node_hash]
+        # Nodes are content-addressed, so they never change once written
+        node_data = await self.db.get(self.NODE_PREFIX + node_hash, immutable=True)
+        if not node_data:
+            raise KeyError(f"Missing state tree node {node_hash}")
+        node: NodeRecord = json.loads(node_data)
+        self._remember(node_hash, node)
+        return node
+
+    def _remember(self, node_hash: str, node: NodeRecord) -> None:
+        self._cache[node_hash] = node
+        self._cache.move_to_end(node_hash)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _store(self, node_hash: str, node: NodeRecord) -> str:
+        self._dirty[node_hash] = node
+        return node_hash
+
+    def _discard(self, node_hash: str) -> None:
+        self._dirty.pop(node_hash, None)
+        self._orphans.add(node_hash)
+
+    async def flush(self) -> None:
+        """Writes all dirty nodes and deletes orphaned ones in one batch each."""
+        if self._dirty:
+            await self.db.mset({self.NODE_PREFIX + node_hash: json.dumps(node) for node_hash, node in self._dirty.items()})
+            for node_hash, node in self._dirty.items():
+                self._remember(node_hash, node)
+        # A node rebuilt with the same hash is still referenced
+        orphans = [self.NODE_PREFIX + node_hash for node_hash in self._orphans if node_hash not in self._dirty]
+        if orphans:
+            await self.db.delete_many(orphans)
+        self._dirty.clear()
+        self._orphans.clear()
+
+    async def get(self, address: str) -> str | None:
+        """Returns the value stored for an address."""
+        while True:
+            root = self.root
+            try:
+                return await self._get(root, address)
+            except KeyError:
+                # An update landed and pruned the nodes of this root, read the new one
+                if self.root == root:
+                    raise
+
+    async def _get(self, root: str, address: str) -> str | None:
+        key = self.key_for(address)
+        path = int(key, 16)
+        node_hash = root
+        for height in range(self.DEPTH, -1, -1):
+            node = await self._load(node_hash, height)
+            if node is None:
+                return None
+            if node[0] == "l":
+                return node[2] if node[1] == key else None
+            node_hash = node[2] if (path >> (height - 1)) & 1 else node[1]
+        return None
+
+    async def update(self, changes: dict[str, str | None]) -> str:
+        """
+        Applies a batch of address -> value changes and returns the new root.
+        A value of None removes the account from the tree.
+        Upper nodes shared by several changed accounts are hashed only once.
+        """
+        if not changes:
+            return self.root
+        updates = {self.key_for(address): value for address, value in changes.items()}
+        self.root, _ = await self._update(self.root, self.DEPTH, updates)
+        await self.flush()
+        return self.root
+
+    async def _update(self, node_hash: str, height: int, updates: dict[str, str | None]) -> tuple[str, tuple[str, str] | None]:
+        """
+        Applies updates to the subtree and returns its new hash
+        along with its only leaf if the subtree holds a single one.
+        """
+        if not updates:
+            return node_hash, None
+
+        node = await self._load(node_hash, height)
+        if node is not None:
+            self._orphans.add(node_hash)
+        if node is None or node[0] == "l":
+            # Every leaf of this subtree is known, rebuild it from scratch
+            leaves: dict[str, str | None] = {} if node is None else {node[1]: node[2]}
+            leaves.update(updates)
+            live = {key: value for key, value in leaves.items() if value is not None}
+            if not live:
+                return self.EMPTY_HASHES[height], None
+            if len(live) == 1:
+                key, value = next(iter(live.items()))
+                return self._store(self.subtree_hash(key, value, height), ["l", key, value]), (key, value)
+            left_hash = right_hash = self.EMPTY_HASHES[height - 1]
+            updates = {**live}
+        else:
+            left_hash, right_hash = node[1], node[2]
+
+        bit = height - 1
+        left_updates = {key: value for key, value in updates.items() if not (int(key, 16) >> bit) & 1}
+        right_updates = {key: value for key, value in updates.items() if (int(key, 16) >> bit) & 1}
+        left_hash, left_leaf = await self._update(left_hash, height - 1, left_updates)
+        right_hash, right_leaf = await self._update(right_hash, height - 1, right_updates)
+
+        empty_child = self.EMPTY_HASHES[height - 1]
+        if left_hash == empty_child and right_hash == empty_child:
+            return self.EMPTY_HASHES[height], None
+
+        combined_hash = self.hash_function(left_hash + right_hash)
+        # A single remaining leaf moves up as a shortcut, its hash is the same as the full subtree's
+        for child_hash, leaf, other_hash in ((left_hash, left_leaf, right_hash), (right_hash, right_leaf, left_hash)):
+            if other_hash != empty_child:
+                continue
+            if leaf is None:
+                child = await self._load(child_hash, height - 1)
+                leaf = (child[1], child[2]) if child is not None and child[0] == "l" else None
+            if leaf is not None:
+                # The child's record is replaced by the shortcut one level up
+                self._discard(child_hash)
+                return self._store(combined_hash, ["l", leaf[0], leaf[1]]), leaf
+        return self._store(combined_hash, ["n", left_hash, right_hash]), None
+
+    async def get_proof(self, address: str) -> tuple[str | None, list[str], str, str]:
+        """
+        Generates a compact proof for an address against the current root.
+        Returns (value, sibling hashes from leaf to root, bitmap, root the proof was built against).
+        Only non-empty siblings are included, the bitmap marks their heights.
+        A value of None makes it a non-inclusion proof.
+        """
+        while True:
+            # Updates may land while nodes are loaded, the proof sticks to this snapshot
+            root = self.root
+            try:
+                value, siblings, bitmap = await self._get_proof(root, address)
+                return value, siblings, bitmap, root
+            except KeyError:
+                # The snapshot's nodes were pruned by that update, prove against the new root
+                if self.root == root:
+                    raise
+
+    async def _get_proof(self, root: str, address: str) -> tuple[str | None, list[str], str]:
+        key = self.key_for(address)
+        path = int(key, 16)
+        siblings: dict[int, str] = {}
+        value: str | None = None
+        node_hash = root
+
+        for height in range(self.DEPTH, 0, -1):
+            node = await self._load(node_hash, height)
+            if node is None:
+                break
+            if node[0] == "l":
+                if node[1] == key:
+                    value = node[2]
+                else:
+                    # Both leaves share the subtree until their paths diverge
+                    other_path = int(node[1], 16)
+                    diverge = (path ^ other_path).bit_length() - 1
+                    siblings[diverge] = self.subtree_hash(node[1], node[2], diverge)
+                break
+            is_right = (path >> (height - 1)) & 1
+            node_hash, sibling_hash = (node[2], node[1]) if is_right else (node[1], node[2])
+            if sibling_hash != self.EMPTY_HASHES[height - 1]:
+                siblings[height - 1] = sibling_hash
+        else:
+            node = await self._load(node_hash, 0)
+            if node is not None:
+                value = node[2]
+
+        bitmap = 0
+        for height in siblings:
+            bitmap |= 1 << height
+        return value, [siblings[height] for height in sorted(siblings)], format(bitmap, "x")
+
+    @classmethod
+    def verify_proof(cls, address: str, value: str | None, siblings: list[str], bitmap: str, root: str) -> bool:
+        """
+        Verifies a compact proof by reconstructing the path to the root.
+        Needs no storage, so light clients can call it on the class.
+        """
+        key = cls.key_for(address)
+        path = int(key, 16)
+        bits = int(bitmap, 16)
+        if bin(bits).count("1") != len(siblings):
+            return False
+
+        current_hash = cls.leaf_hash(key, value) if value is not None else cls.EMPTY_HASHES[0]
+        remaining = iter(siblings)
+        for height in range(cls.DEPTH):
+            sibling_hash = next(remaining) if (bits >> height) & 1 else cls.EMPTY_HASHES[height]
+            if (path >> height) & 1:
+                current_hash = cls.hash_function(sibling_hash + current_hash)
+            else:
+                current_hash = cls.hash_function(current_hash + sibling_hash)
+
+        return current_hash == root
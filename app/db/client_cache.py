@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+# Marks a cache miss, since None is a valid cached value
+MISSING = object()
+
+
+class ClientSideCache:
+    """
+    Client-side cache is a size-bounded LRU map of KeyDB values
+    immutable entries never expire, mutable entries expire after the TTL
+    the least recently used entry is evicted once the cache is full
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float | None = 60.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> (value, immutable, expiry timestamp or None if it never expires)
+        self._entries: OrderedDict[str, tuple[Any, bool, float | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Any:
+        """Returns the cached value for key or MISSING."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        value, _, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, immutable: bool = False) -> None:
+        """Caches value for key, mutable entries expire after the TTL."""
+        expires_at = None if immutable or self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (value, immutable, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        """Drops key from the cache."""
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self, mutable_only: bool = False) -> None:
+        """Drops all entries, or only the mutable ones."""
+        keys = [key for key, (_, immutable, _) in self._entries.items() if not mutable_only or not immutable]
+        for key in keys:
+            self.invalidate(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, float]:
+        """Returns cache metrics."""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -1,8 +1,14 @@
+import asyncio
 from typing import Any
 
 import redis.asyncio as redis
-from redis.asyncio.connection import ConnectionPool
+from redis.asyncio.connection import Connection, ConnectionPool
 from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+
+from .client_cache import MISSING, ClientSideCache
+
+INVALIDATION_CHANNEL = "__redis__:invalidate"
 
 
 class KeyDBClient:
@@ -14,35 +20,162 @@ class KeyDBClient:
         password: str | None = None,
         max_connections: int = 10,
         decode_responses: bool = True,
+        cache_size: int = 0,
+        cache_ttl: float | None = 60.0,
     ) -> None:
-        retry = Retry(max_attempts=3, backoff=1)
+        retry = Retry(ExponentialBackoff(), 3)
+        self._connection_kwargs: dict[str, Any] = {
+            "host": host,
+            "port": port,
+            "db": db,
+            "password": password,
+            "decode_responses": decode_responses,
+        }
         self.pool = ConnectionPool(
-            host=host,
-            port=port,
-            db=db,
-            password=password,
             max_connections=max_connections,
-            decode_responses=decode_responses,
             retry=retry,
+            redis_connect_func=self._on_connect,
+            **self._connection_kwargs,
         )
         self.client: redis.Redis = redis.Redis(connection_pool=self.pool)
+        # Optional read-through cache, disabled when cache_size is 0
+        self.cache: ClientSideCache | None = ClientSideCache(cache_size, cache_ttl) if cache_size else None
+        self._tracking_id: int | None = None
+        self._listener: Connection | None = None
+        self._listener_task: asyncio.Task | None = None
+        # Bumped on every invalidation so reads racing with one are not cached
+        self._invalidation_epoch = 0
+
+    async def _on_connect(self, connection: Connection) -> None:
+        """Enables invalidation tracking on new pool connections."""
+        await connection.on_connect()
+        if self._tracking_id is not None:
+            await connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", self._tracking_id)
+            await connection.read_response()
+
+    async def start_tracking(self) -> None:
+        """
+        Enables server-assisted invalidation so mutable keys can be cached.
+        A dedicated RESP3 connection subscribes to invalidation messages for every key
+        read through the pool, whose connections are reopened with CLIENT TRACKING.
+        """
+        if self.cache is None or self._listener_task is not None:
+            return
+        listener = self._new_listener()
+        await listener.connect()
+        await listener.send_command("CLIENT", "ID")
+        self._tracking_id = int(await listener.read_response())
+        await listener.send_command("SUBSCRIBE", INVALIDATION_CHANNEL)
+        await listener.read_response(push_request=True)
+        self._listener = listener
+        await self.pool.disconnect()
+        self._listener_task = asyncio.create_task(self._listen_for_invalidations())
+
+    def _new_listener(self) -> Connection:
+        listener = Connection(protocol=3, **self._connection_kwargs)
+        # Without a handler the parser swallows invalidate push frames and returns None,
+        # only the RESP3 parser has the hook so it isn't part of the declared parser type
+        parser: Any = listener._parser
+        parser.invalidation_push_handler_func = self._on_invalidation_push
+        return listener
+
+    async def _on_invalidation_push(self, message: list) -> None:
+        """Drops the keys of an invalidate push frame, message[1] is None after a flush."""
+        self._invalidate(message[1])
 
-    async def get(self, key: str) -> Any:
-        """Get value for key."""
-        return await self.client.get(key)
+    async def _listen_for_invalidations(self) -> None:
+        """Drops cached keys written by any client until the listener connection is lost."""
+        assert self._listener is not None and self.cache is not None
+        try:
+            while True:
+                # Invalidate push frames are handled inside the parser, pub/sub messages are returned
+                message = await self._listener.read_response(timeout=None, push_request=True)
+                if not isinstance(message, list) or not message:
+                    continue
+                kind = message[0].decode() if isinstance(message[0], bytes) else message[0]
+                if kind == "message" and len(message) == 3:
+                    self._invalidate(message[2])
+        except (redis.ConnectionError, OSError):
+            pass
+        finally:
+            # Invalidations may have been missed, mutable entries can't be trusted anymore
+            self._tracking_id = None
+            self._listener_task = None
+            self.cache.clear(mutable_only=True)
+
+    def _invalidate(self, keys: list[str | bytes] | None) -> None:
+        assert self.cache is not None
+        self._invalidation_epoch += 1
+        if keys is None:  # The server flushed its whole keyspace
+            self.cache.clear(mutable_only=True)
+            return
+        for key in keys:
+            self.cache.invalidate(key.decode() if isinstance(key, bytes) else key)
+
+    async def get(self, key: str, immutable: bool = False) -> Any:
+        """
+        Get value for key.
+        Immutable values are served from the local cache indefinitely,
+        mutable values only while invalidation tracking is active.
+        """
+        if self.cache is None or not (immutable or self._tracking_id is not None):
+            return await self.client.get(key)
+
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+        epoch = self._invalidation_epoch
+        value = await self.client.get(key)
+        if value is not None and (immutable or epoch == self._invalidation_epoch):
+            self.cache.set(key, value, immutable=immutable)
+        return value
+
+    async def mget(self, keys: list[str]) -> list[Any]:
+        """Get values for multiple keys in a single round trip."""
+        return await self.client.mget(keys)
 
     async def set(self, key: str, value: str) -> bool:
         """Set key to value."""
-        return await self.client.set(key, value)
+        result = await self.client.set(key, value)
+        if self.cache is not None:
+            self._invalidate([key])
+        return bool(result)
+
+    async def mset(self, mapping: dict[str, str]) -> bool:
+        """Set multiple keys in a single round trip."""
+        result = await self.client.mset(mapping)
+        if self.cache is not None:
+            self._invalidate(list(mapping))
+        return bool(result)
 
     async def delete(self, key: str) -> bool:
         """Delete key."""
-        return bool(await self.client.delete(key))
+        result = await self.client.delete(key)
+        if self.cache is not None:
+            self._invalidate([key])
+        return bool(result)
+
+    async def delete_many(self, keys: list[str]) -> int:
+        """Delete multiple keys in a single round trip and return how many existed."""
+        result = await self.client.delete(*keys)
+        if self.cache is not None:
+            self._invalidate(list(keys))
+        return int(result)
 
     async def exists(self, key: str) -> bool:
         """Check if key exists."""
         return bool(await self.client.exists(key))
 
+    def cache_stats(self) -> dict[str, float]:
+        """Returns hit ratio and eviction metrics of the local cache."""
+        return self.cache.stats() if self.cache is not None else {}
+
     async def close(self) -> None:
-        """Close all connections in the pool."""
+        """Stop invalidation tracking and close all connections in the pool."""
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            await asyncio.gather(self._listener_task, return_exceptions=True)
+        if self._listener is not None:
+            await self._listener.disconnect()
+            self._listener = None
         await self.pool.disconnect()
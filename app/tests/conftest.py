@@ -2,6 +2,13 @@ from datetime import datetime
 
 import pytest
 from blockchain.dto import BlockDTO, TransactionDTO
+from tests.mocks import MockKeyDBClient
+
+
+@pytest.fixture
+def mock_keydb_client() -> MockKeyDBClient:
+    """Fixture providing an empty in-memory KeyDB client."""
+    return MockKeyDBClient()
 
 
 @pytest.fixture
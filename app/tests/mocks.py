@@ -1,25 +1,34 @@
-from typing import Self
+from db.keydb_client import KeyDBClient
 
-import pytest
 
+class MockKeyDBClient(KeyDBClient):
+    """In-memory stand-in for KeyDB, the store survives close() so tests can reopen it."""
 
-class MockKeyDBClient:
     def __init__(self) -> None:
         self.store: dict[str, str] = {}
+        self.reads = 0
 
-    async def get(self, key: str) -> str | None:
+    async def get(self, key: str, immutable: bool = False) -> str | None:
+        self.reads += 1
         return self.store.get(key)
 
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        self.reads += 1
+        return [self.store.get(key) for key in keys]
+
     async def set(self, key: str, value: str) -> bool:
         self.store[key] = value
         return True
 
-    async def close(self) -> None:
-        self.store.clear()
+    async def mset(self, mapping: dict[str, str]) -> bool:
+        self.store.update(mapping)
+        return True
 
+    async def delete(self, key: str) -> bool:
+        return self.store.pop(key, None) is not None
 
-@pytest.fixture(scope="function")
-async def mock_keydb_client() -> Self:
-    client = MockKeyDBClient()
-    yield client
-    await client.close()
+    async def delete_many(self, keys: list[str]) -> int:
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from blockchain.archive import BlockArchive, BlockHeader
+from tests.mocks import MockKeyDBClient
+
+
+def block_json(i: int) -> str:
+    return json.dumps({"block_number": i, "block_hash": f"0x{i}", "transactions": []})
+
+
+def block_entry(i: int) -> tuple[BlockHeader, str]:
+    return BlockHeader(f"0x{i}", i, f"root{i}"), block_json(i)
+
+
+@pytest.mark.asyncio
+async def test_write_and_read_segments() -> None:
+    """Test reading blocks back from compressed segments by chain position."""
+    archive = BlockArchive(MockKeyDBClient(), segment_size=4)
+    for start in (0, 4):
+        await archive.write_segment([block_entry(i) for i in range(start, start + 4)])
+
+    assert archive.archived_count == 8
+    for i in range(8):
+        assert await archive.get(i, f"0x{i}") == block_json(i)
+    assert await archive.get(8, "0x8") is None
+    assert await archive.get(1, "0xother") is None
+
+
+@pytest.mark.asyncio
+async def test_decompressed_segments_are_cached() -> None:
+    """Test that only the needed segment is fetched and then served from the cache."""
+    db = MockKeyDBClient()
+    archive = BlockArchive(db, segment_size=4, cache_size=1)
+    for start in (0, 4):
+        await archive.write_segment([block_entry(i) for i in range(start, start + 4)])
+
+    for i in range(4):
+        await archive.get(i, f"0x{i}")
+    assert db.reads == 2  # Segment and its offset index
+
+    await archive.get(4, "0x4")
+    await archive.get(0, "0x0")
+    assert db.reads == 6  # The cache holds a single segment
+
+
+@pytest.mark.asyncio
+async def test_segments_are_compressed() -> None:
+    """Test that a segment is smaller than the blocks it holds."""
+    db = MockKeyDBClient()
+    archive = BlockArchive(db, segment_size=32)
+    blocks = [block_entry(i) for i in range(32)]
+    await archive.write_segment(blocks)
+
+    assert len(db.store["archive:segment:0"]) < sum(len(data) for _, data in blocks) / 2
+
+    reopened = BlockArchive(db, segment_size=32)
+    await reopened.load()
+    assert reopened.segment_count == 1
+    # Headers come from the offset index, the segment itself isn't read
+    reads = db.reads
+    assert await reopened.load_headers() == [header for header, _ in blocks]
+    assert db.reads == reads + 1
+
+
+@pytest.mark.asyncio
+async def test_segment_size_is_persisted() -> None:
+    """Test that a reopened archive keeps the segment size its segments were written with."""
+    db = MockKeyDBClient()
+    archive = BlockArchive(db, segment_size=2)
+    for start in (0, 2):
+        await archive.write_segment([block_entry(i) for i in range(start, start + 2)])
+
+    reopened = BlockArchive(db)
+    await reopened.load()
+    assert reopened.segment_size == 2
+    assert reopened.archived_count == 4
+    for i in range(4):
+        assert await reopened.get(i, f"0x{i}") == block_json(i)
+
+    with pytest.raises(ValueError):
+        await BlockArchive(db, segment_size=4).load()
@@ -1,29 +1,14 @@
+import asyncio
 from datetime import datetime
 from typing import Self
 
 import pytest
+from blockchain.archive import BlockHeader
 from blockchain.dto import BlockDTO, TransactionDTO
 from blockchain.handler import Block, PersistentBlockchainHandler
-from db.keydb_client import KeyDBClient
-
-
-class MockKeyDBClient(KeyDBClient):
-    def __init__(self) -> None:
-        self.store: dict[str, str] = {}
-
-    async def get(self, key: str) -> str | None:
-        return self.store.get(key)
-
-    async def set(self, key: str, value: str) -> None:
-        self.store[key] = value
-
-    async def close(self) -> None:
-        pass
-
-
-@pytest.fixture
-def mock_keydb_client() -> MockKeyDBClient:
-    return MockKeyDBClient()
+from blockchain.mountain_range import MerkleMountainRange
+from blockchain.sparse_merkle_tree import SparseMerkleTree
+from tests.mocks import MockKeyDBClient
 
 
 @pytest.fixture
@@ -154,3 +139,264 @@ class TestBlockHandler:
 
         assert hash1 == hash2
         assert len(hash1) == 64  # SHA-256 produces 64 character hex string
+
+
+@pytest.mark.asyncio
+async def test_store_block_records_state_root(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test that storing a block updates balances and records the state root."""
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        block = Block(sample_block_dto)
+        await blockchain.store_block(block)
+
+        assert block.state_root == blockchain.state_tree.root
+        assert await blockchain.get_balance("0xsender1") == "-1.5"
+        assert await blockchain.get_balance("0xreceiver2") == "2.5"
+
+        retrieved_block_data = await blockchain.get_block(block.block_hash)
+        assert retrieved_block_data["state_root"] == block.state_root
+
+    async with PersistentBlockchainHandler(mock_keydb_client) as reloaded:
+        assert reloaded.state_tree.root == block.state_root
+        assert await reloaded.get_balance("0xreceiver1") == "1.5"
+
+
+@pytest.mark.asyncio
+async def test_balance_proof(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test serving balance and non-inclusion proofs."""
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        await blockchain.store_block(Block(sample_block_dto))
+
+        proof = await blockchain.get_balance_proof("0xreceiver1")
+        assert proof.balance == "1.5"
+        assert SparseMerkleTree.verify_proof(proof.address, proof.balance, proof.siblings, proof.bitmap, proof.state_root)
+
+        missing = await blockchain.get_balance_proof("0xunknown")
+        assert missing.balance is None
+        assert SparseMerkleTree.verify_proof(missing.address, None, missing.siblings, missing.bitmap, missing.state_root)
+
+
+@pytest.mark.asyncio
+async def test_balance_proof_during_store(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test that a balance proof overlapping a stored block is labelled with the root it was built against."""
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        await blockchain.store_block(Block(sample_block_dto))
+
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        paused, resume = asyncio.Event(), asyncio.Event()
+        get = mock_keydb_client.get
+
+        async def slow_get(key: str, immutable: bool = False) -> str | None:
+            if key.startswith(SparseMerkleTree.NODE_PREFIX):
+                paused.set()
+                await resume.wait()
+            return await get(key, immutable)
+
+        mock_keydb_client.get = slow_get
+        pending = asyncio.create_task(blockchain.get_balance_proof("0xreceiver1"))
+        await paused.wait()
+        mock_keydb_client.get = get
+        await blockchain.store_block(Block(sample_block_dto.model_copy(update={"block_number": 2, "block_hash": "0x790"})))
+        resume.set()
+
+        proof = await pending
+        assert proof.balance == "3.0"
+        assert proof.state_root == blockchain.state_tree.root
+        assert SparseMerkleTree.verify_proof(proof.address, proof.balance, proof.siblings, proof.bitmap, proof.state_root)
+
+
+@pytest.mark.asyncio
+async def test_get_blocks_by_address(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test finding blocks involving an address through their Bloom filters."""
+    blocks = []
+    for i in range(5):
+        transactions = [
+            tx.model_copy(update={"to_address": f"0xreceiver{i}", "tx_hash": f"0x{i}"}) for tx in sample_block_dto.transactions
+        ]
+        blocks.append(
+            Block(
+                sample_block_dto.model_copy(
+                    update={"block_number": i + 1, "block_hash": f"0x{i+1}", "transactions": transactions}
+                )
+            )
+        )
+
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        for block in blocks:
+            await blockchain.store_block(block)
+
+        assert [b["block_hash"] for b in await blockchain.get_blocks_by_address("0xreceiver2")] == ["0x3"]
+        assert len(await blockchain.get_blocks_by_address("0xsender1")) == 5
+        assert len(await blockchain.get_blocks_by_address("0xsender1", from_block=2, to_block=3)) == 2
+        assert await blockchain.get_blocks_by_address("0xunknown") == []
+        assert (await blockchain.get_block_by_tx_hash("0x4"))["block_hash"] == "0x5"
+        assert await blockchain.get_block_by_tx_hash("0xmissing") == {}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_are_coalesced(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test that concurrent reads of the same block hit KeyDB once."""
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        block = Block(sample_block_dto)
+        await blockchain.store_block(block)
+
+        reads = 0
+        get = mock_keydb_client.get
+
+        async def counting_get(key: str, immutable: bool = False) -> str | None:
+            nonlocal reads
+            reads += 1
+            await asyncio.sleep(0)
+            return await get(key, immutable)
+
+        mock_keydb_client.get = counting_get
+        results = await asyncio.gather(
+            *[blockchain.get_block(block.block_hash) for _ in range(5)],
+            *[blockchain.get_block_by_number(block.block_number) for _ in range(5)],
+        )
+
+        assert reads == 1
+        assert all(result["block_hash"] == block.block_hash for result in results)
+
+
+@pytest.mark.asyncio
+async def test_get_transaction_proof(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test generating transaction proofs for a stored block."""
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        missing = await blockchain.get_transaction_proof("0x789", "0x123")
+        block = Block(sample_block_dto)
+        await blockchain.store_block(block)
+
+        proofs = await asyncio.gather(*[blockchain.get_transaction_proof(block.block_hash, "0x123") for _ in range(3)])
+        tx_string = block._transaction_to_string(sample_block_dto.transactions[0])
+
+        assert missing is None
+        assert proofs[0] is proofs[1] is proofs[2]
+        assert block.merkle_tree.verify_merkle_proof(tx_string, proofs[0], block.merkle_root) is True
+        assert await blockchain.get_transaction_proof(block.block_hash, "0xmissing") is None
+
+
+@pytest.mark.asyncio
+async def test_block_inclusion_proof(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test proving that stored blocks belong to the chain."""
+    blocks = [Block(sample_block_dto.model_copy(update={"block_number": i + 1, "block_hash": f"0x{i+1}"})) for i in range(5)]
+
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        for block in blocks:
+            await blockchain.store_block(block)
+        chain_root = blockchain.get_chain_root()
+
+        for block in blocks:
+            proof = await blockchain.get_block_inclusion_proof(block.block_hash)
+            assert proof is not None
+            assert proof.chain_root == chain_root
+            assert MerkleMountainRange.verify_proof(
+                block.block_hash, proof.siblings, proof.peaks, proof.leaf_index, proof.chain_size, proof.chain_root
+            )
+
+        assert await blockchain.get_block_inclusion_proof("0xmissing") is None
+
+    async with PersistentBlockchainHandler(mock_keydb_client) as reloaded:
+        assert reloaded.get_chain_root() == chain_root
+
+
+@pytest.mark.asyncio
+async def test_old_blocks_are_archived(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test that blocks deeper than the archive depth are read through compressed segments."""
+    blocks = [Block(sample_block_dto.model_copy(update={"block_number": i + 1, "block_hash": f"0x{i+1}"})) for i in range(7)]
+
+    async with PersistentBlockchainHandler(mock_keydb_client, archive_depth=2, segment_size=2) as blockchain:
+        for block in blocks:
+            await blockchain.store_block(block)
+
+        assert blockchain.archive.archived_count == 4
+        # Archived heights keep only their header in memory
+        assert [type(block) for block in blockchain.chain] == [BlockHeader] * 4 + [Block] * 3
+        assert [block.block_hash for block in blocks if block.block_hash in mock_keydb_client.store] == ["0x5", "0x6", "0x7"]
+        for block in blocks:
+            assert (await blockchain.get_block(block.block_hash))["block_number"] == block.block_number
+
+    async with PersistentBlockchainHandler(mock_keydb_client, archive_depth=2, segment_size=2) as reloaded:
+        assert [block.block_hash for block in reloaded.chain] == [block.block_hash for block in blocks]
+        assert [type(block) for block in reloaded.chain] == [BlockHeader] * 4 + [Block] * 3
+        assert reloaded.state_tree.root == blockchain.state_tree.root
+        assert (await reloaded.get_block_by_number(2))["block_hash"] == "0x2"
+
+    # Positions in the archive depend on the size the segments were written with
+    async with PersistentBlockchainHandler(mock_keydb_client) as reloaded:
+        assert [block.block_hash for block in reloaded.chain] == [block.block_hash for block in blocks]
+    with pytest.raises(ValueError):
+        async with PersistentBlockchainHandler(mock_keydb_client, archive_depth=2, segment_size=3):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_archiving_batches_round_trips(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test that a segment is archived with one read and one delete of its hot blocks."""
+    blocks = [Block(sample_block_dto.model_copy(update={"block_number": i + 1, "block_hash": f"0x{i+1}"})) for i in range(4)]
+    block_hashes = [block.block_hash for block in blocks]
+
+    async with PersistentBlockchainHandler(mock_keydb_client, archive_depth=0, segment_size=4) as blockchain:
+        for block in blocks[:3]:
+            await blockchain.store_block(block)
+        reads: list[str] = []
+        get, mget = mock_keydb_client.get, mock_keydb_client.mget
+
+        async def recording_get(key: str, immutable: bool = False) -> str | None:
+            reads.append(key)
+            return await get(key, immutable)
+
+        async def recording_mget(keys: list[str]) -> list[str | None]:
+            reads.extend(keys)
+            return await mget(keys)
+
+        async def failing_delete(key: str) -> bool:
+            raise AssertionError(f"{key} deleted on its own")
+
+        mock_keydb_client.get, mock_keydb_client.mget, mock_keydb_client.delete = recording_get, recording_mget, failing_delete
+        await blockchain.store_block(blocks[3])
+
+        assert blockchain.archive.archived_count == 4
+        assert [key for key in reads if key in block_hashes] == block_hashes
+        assert not any(block_hash in mock_keydb_client.store for block_hash in block_hashes)
+
+
+@pytest.mark.asyncio
+async def test_missing_block_is_not_archived(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test that a segment with a missing block body isn't written short."""
+    blocks = [Block(sample_block_dto.model_copy(update={"block_number": i + 1, "block_hash": f"0x{i+1}"})) for i in range(2)]
+
+    async with PersistentBlockchainHandler(mock_keydb_client, archive_depth=0, segment_size=2) as blockchain:
+        await blockchain.store_block(blocks[0])
+        del mock_keydb_client.store["0x1"]
+
+        with pytest.raises(KeyError):
+            await blockchain.store_block(blocks[1])
+
+        assert blockchain.archive.segment_count == 0
+        assert "0x2" in mock_keydb_client.store
+        assert [type(block) for block in blockchain.chain] == [Block, Block]
+
+
+@pytest.mark.asyncio
+async def test_pending_miss_is_not_cached_after_store(mock_keydb_client: MockKeyDBClient, sample_block_dto: BlockDTO) -> None:
+    """Test that a lookup missing a block while it is being stored doesn't hide it afterwards."""
+    async with PersistentBlockchainHandler(mock_keydb_client) as blockchain:
+        block = Block(sample_block_dto)
+        missed, release = asyncio.Event(), asyncio.Event()
+        get = mock_keydb_client.get
+
+        async def slow_get(key: str, immutable: bool = False) -> str | None:
+            value = await get(key, immutable)
+            if key == block.block_hash:
+                missed.set()
+                await release.wait()
+            return value
+
+        mock_keydb_client.get = slow_get
+        pending = asyncio.create_task(blockchain.get_block(block.block_hash))
+        await missed.wait()
+        await blockchain.store_block(block)
+        release.set()
+
+        assert await pending == {}
+        assert (await blockchain.get_block(block.block_hash))["block_hash"] == block.block_hash
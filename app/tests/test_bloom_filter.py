@@ -0,0 +1,31 @@
+from blockchain.bloom_filter import BloomFilter
+
+
+class TestBloomFilter:
+    def test_added_items_are_found(self) -> None:
+        """Test that every added item is reported as possibly present."""
+        items = [f"0xsender{i}" for i in range(50)]
+        bloom = BloomFilter(items)
+
+        assert all(bloom.might_contain(item) for item in items)
+
+    def test_empty_filter_contains_nothing(self) -> None:
+        """Test that an empty filter rejects every item."""
+        bloom = BloomFilter()
+
+        assert bloom.might_contain("0xsender1") is False
+
+    def test_absent_items_are_mostly_rejected(self) -> None:
+        """Test that the false positive rate stays low for a typical block."""
+        bloom = BloomFilter([f"0xsender{i}" for i in range(50)])
+        false_positives = sum(bloom.might_contain(f"0xother{i}") for i in range(1000))
+
+        assert false_positives < 50
+
+    def test_hex_round_trip(self) -> None:
+        """Test serialising a filter to a fixed-size hex string and back."""
+        bloom = BloomFilter(["0xsender1", "0x123"])
+        data = bloom.to_hex()
+
+        assert len(data) == BloomFilter.SIZE // 4
+        assert BloomFilter.from_hex(data).bits == bloom.bits
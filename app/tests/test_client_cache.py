@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from db.client_cache import MISSING, ClientSideCache
+
+
+class TestClientSideCache:
+    def test_get_and_set(self) -> None:
+        """Test caching a value and counting hits and misses."""
+        cache = ClientSideCache()
+
+        assert cache.get("block") is MISSING
+        cache.set("block", "data")
+        assert cache.get("block") == "data"
+        assert cache.hits == 1
+        assert cache.misses == 1
+        assert cache.hit_ratio == 0.5
+
+    def test_lru_eviction(self) -> None:
+        """Test that the least recently used entry is evicted first."""
+        cache = ClientSideCache(max_size=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert cache.get("b") is MISSING
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+        assert cache.evictions == 1
+
+    def test_ttl_expiry(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that mutable entries expire while immutable ones stay."""
+        cache = ClientSideCache(ttl=10)
+        cache.set("tip", "0x1")
+        cache.set("block", "data", immutable=True)
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+        assert cache.get("tip") is MISSING
+        assert cache.get("block") == "data"
+        assert cache.evictions == 1
+
+    def test_clear_mutable_only(self) -> None:
+        """Test dropping only mutable entries."""
+        cache = ClientSideCache()
+        cache.set("tip", "0x1")
+        cache.set("block", "data", immutable=True)
+
+        cache.clear(mutable_only=True)
+
+        assert len(cache) == 1
+        assert cache.get("block") == "data"
+        assert cache.stats()["invalidations"] == 1
+
+    def test_clear_mutable_only_without_ttl(self) -> None:
+        """Test that mutable entries are dropped even when they never expire."""
+        cache = ClientSideCache(ttl=None)
+        cache.set("tip", "0x1")
+        cache.set("block", "data", immutable=True)
+
+        cache.clear(mutable_only=True)
+
+        assert cache.get("tip") is MISSING
+        assert cache.get("block") == "data"
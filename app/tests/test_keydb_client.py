@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from db.keydb_client import INVALIDATION_CHANNEL, KeyDBClient
+from redis.exceptions import ConnectionError
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, str] = {}
+        self.calls = 0
+
+    async def get(self, key: str) -> str | None:
+        self.calls += 1
+        return self.store.get(key)
+
+    async def set(self, key: str, value: str) -> bool:
+        self.store[key] = value
+        return True
+
+    async def delete(self, key: str) -> int:
+        return 1 if self.store.pop(key, None) is not None else 0
+
+
+class FakeListener:
+    def __init__(self, messages: list) -> None:
+        self.messages = messages
+
+    async def read_response(self, timeout: float | None = None, push_request: bool = False) -> list:
+        if not self.messages:
+            raise ConnectionError("Connection closed")
+        return self.messages.pop(0)
+
+
+@pytest.fixture
+def keydb_client() -> KeyDBClient:
+    client = KeyDBClient(cache_size=100)
+    client.client = FakeRedis()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_immutable_keys_are_cached(keydb_client: KeyDBClient) -> None:
+    """Test that immutable keys are read from KeyDB only once."""
+    await keydb_client.set("0x789", "block")
+
+    assert await keydb_client.get("0x789", immutable=True) == "block"
+    assert await keydb_client.get("0x789", immutable=True) == "block"
+    assert keydb_client.client.calls == 1
+    assert keydb_client.cache_stats()["hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_mutable_keys_need_tracking(keydb_client: KeyDBClient) -> None:
+    """Test that mutable keys are only cached while tracking is active."""
+    await keydb_client.set("blockchain_chain", "[]")
+
+    await keydb_client.get("blockchain_chain")
+    await keydb_client.get("blockchain_chain")
+    assert keydb_client.client.calls == 2
+
+    keydb_client._tracking_id = 1
+    await keydb_client.get("blockchain_chain")
+    await keydb_client.get("blockchain_chain")
+    assert keydb_client.client.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_cached_keys(keydb_client: KeyDBClient) -> None:
+    """Test that local writes drop the cached value."""
+    keydb_client._tracking_id = 1
+    await keydb_client.set("blockchain_chain", "[]")
+    await keydb_client.get("blockchain_chain")
+
+    await keydb_client.set("blockchain_chain", '["0x1"]')
+
+    assert await keydb_client.get("blockchain_chain") == '["0x1"]'
+
+
+@pytest.mark.asyncio
+async def test_server_invalidation_messages(keydb_client: KeyDBClient) -> None:
+    """Test that invalidation messages from KeyDB drop cached keys and a lost listener disables tracking."""
+    keydb_client._tracking_id = 1
+    await keydb_client.set("tip", "0x1")
+    await keydb_client.set("other", "0x2")
+    await keydb_client.set("0x789", "block")
+    await keydb_client.get("tip")
+    await keydb_client.get("other")
+    await keydb_client.get("0x789", immutable=True)
+
+    keydb_client._listener = FakeListener([["message", INVALIDATION_CHANNEL, ["tip"]]])
+    await keydb_client._listen_for_invalidations()
+
+    assert keydb_client._tracking_id is None
+    assert keydb_client.cache is not None
+    assert len(keydb_client.cache) == 1  # Only the immutable block is left
+    assert keydb_client.cache_stats()["invalidations"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_push_frames(keydb_client: KeyDBClient) -> None:
+    """Test that RESP3 invalidate push frames read by the real parser drop cached keys."""
+    keydb_client._tracking_id = 1
+    await keydb_client.set("tip", "0x1")
+    await keydb_client.set("other", "0x2")
+    await keydb_client.get("tip")
+    await keydb_client.get("other")
+
+    listener = keydb_client._new_listener()
+    listener._reader = asyncio.StreamReader()
+    listener._parser.on_connect(listener)
+    keydb_client._listener = listener
+    task = asyncio.create_task(keydb_client._listen_for_invalidations())
+    listener._reader.feed_data(b">2\r\n$10\r\ninvalidate\r\n*1\r\n$3\r\ntip\r\n")
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    assert keydb_client.cache is not None
+    assert keydb_client.cache_stats()["invalidations"] == 1
+    await keydb_client.client.set("other", "0x3")  # Not tracked locally, still served from the cache
+    assert await keydb_client.get("other") == "0x2"
+    assert await keydb_client.get("tip") == "0x1"
+    assert keydb_client.client.calls == 3
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_lost_listener_drops_entries_without_ttl() -> None:
+    """Test that mutable entries without a TTL aren't served after invalidations may have been missed."""
+    keydb_client = KeyDBClient(cache_size=100, cache_ttl=None)
+    keydb_client.client = FakeRedis()
+    keydb_client._tracking_id = 1
+    await keydb_client.set("tip", "0x1")
+    await keydb_client.get("tip")
+
+    keydb_client._listener = FakeListener([])
+    await keydb_client._listen_for_invalidations()
+    await keydb_client.client.set("tip", "0x2")  # Written by another client while untracked
+    keydb_client._tracking_id = 1
+
+    assert await keydb_client.get("tip") == "0x2"
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from blockchain.merkle_tree import MerkleTree
+from blockchain.mountain_range import MerkleMountainRange
+from tests.mocks import MockKeyDBClient
+
+
+@pytest.fixture
+def mmr() -> MerkleMountainRange:
+    return MerkleMountainRange(MockKeyDBClient())
+
+
+@pytest.mark.asyncio
+async def test_peaks_follow_size(mmr: MerkleMountainRange) -> None:
+    """Test that there is one peak per set bit of the number of leaves."""
+    assert mmr.get_root() is None
+
+    for i in range(11):
+        assert await mmr.append(f"0x{i}") == i
+
+    assert mmr.size == 11
+    assert len(mmr.peaks) == bin(11).count("1")
+
+
+@pytest.mark.asyncio
+async def test_power_of_two_matches_merkle_tree(mmr: MerkleMountainRange) -> None:
+    """Test that a single peak equals the Merkle Root of the same leaves."""
+    block_hashes = [f"0x{i}" for i in range(8)]
+    for block_hash in block_hashes:
+        await mmr.append(block_hash)
+
+    assert mmr.get_root() == MerkleTree(block_hashes).get_merkle_root()
+
+
+@pytest.mark.asyncio
+async def test_inclusion_proofs(mmr: MerkleMountainRange) -> None:
+    """Test generating and verifying proofs for every leaf."""
+    for i in range(13):
+        await mmr.append(f"0x{i}")
+    root = mmr.get_root()
+    assert root is not None
+
+    for i in range(13):
+        result = await mmr.get_proof(i)
+        assert result is not None
+        proof, _, peaks, size = result
+        assert MerkleMountainRange.verify_proof(f"0x{i}", proof, peaks, i, size, root) is True
+        assert MerkleMountainRange.verify_proof("0xforged", proof, peaks, i, size, root) is False
+
+    assert await mmr.get_proof(13) is None
+
+
+@pytest.mark.asyncio
+async def test_internal_node_is_not_a_block_hash(mmr: MerkleMountainRange) -> None:
+    """Test that two merged leaves can't be passed off as a block hash with a shortened proof."""
+    for i in range(13):
+        await mmr.append(f"0x{i}")
+    root = mmr.get_root()
+    assert root is not None
+    result = await mmr.get_proof(0)
+    assert result is not None
+    proof, _, peaks, size = result
+
+    forged_hash = mmr.db.store[mmr._node_key(0, 0)] + mmr.db.store[mmr._node_key(0, 1)]
+    for leaf_index in range(size):
+        assert MerkleMountainRange.verify_proof(forged_hash, proof[1:], peaks, leaf_index, size, root) is False
+
+
+@pytest.mark.asyncio
+async def test_load_from_storage() -> None:
+    """Test that a mountain range can be reopened from KeyDB."""
+    db = MockKeyDBClient()
+    mmr = MerkleMountainRange(db)
+    for i in range(5):
+        await mmr.append(f"0x{i}")
+
+    reopened = MerkleMountainRange(db)
+    await reopened.load()
+    await reopened.append("0x5")
+    await mmr.append("0x5")
+
+    assert reopened.size == 6
+    assert reopened.get_root() == mmr.get_root()
+    assert await reopened.get_leaf_index("0x3") == 3
+
+
+@pytest.mark.asyncio
+async def test_append_is_atomic_for_readers(mmr: MerkleMountainRange) -> None:
+    """Test that readers see the range before or after an append, never in between."""
+    for i in range(7):
+        await mmr.append(f"0x{i}")
+    root, peaks = mmr.get_root(), mmr.peaks
+    assert root is not None
+    written, release = asyncio.Event(), asyncio.Event()
+    mset = mmr.db.mset
+
+    async def slow_mset(mapping: dict[str, str]) -> bool:
+        written.set()
+        await release.wait()
+        return await mset(mapping)
+
+    mmr.db.mset = slow_mset
+    append = asyncio.create_task(mmr.append("0x7"))
+    await written.wait()
+
+    assert mmr.size == 7
+    assert mmr.get_root() == root
+    result = await mmr.get_proof(6)
+    assert result is not None
+    proof, _, proof_peaks, size = result
+    assert (proof_peaks, size) == (peaks, 7)
+    assert MerkleMountainRange.verify_proof("0x6", proof, proof_peaks, 6, size, root) is True
+
+    release.set()
+    await append
+    assert mmr.size == 8
+    assert len(mmr.peaks) == 1
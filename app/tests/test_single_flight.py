@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from blockchain.single_flight import SingleFlight
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def fetch(self) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return "block"
+
+    async def fail(self) -> str:
+        self.calls += 1
+        await self.release.wait()
+        raise ValueError("KeyDB unavailable")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_flight() -> None:
+    """Test that concurrent callers of the same key run the work once."""
+    requests = SingleFlight()
+    counter = Counter()
+
+    waiters = [asyncio.create_task(requests.do("0x789", counter.fetch)) for _ in range(10)]
+    await asyncio.sleep(0)
+    counter.release.set()
+
+    assert await asyncio.gather(*waiters) == ["block"] * 10
+    assert counter.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_result_is_kept_until_ttl_expires() -> None:
+    """Test that a result is reused briefly and then fetched again."""
+    requests = SingleFlight(ttl=0.05)
+    counter = Counter()
+    counter.release.set()
+
+    await requests.do("0x789", counter.fetch)
+    await requests.do("0x789", counter.fetch)
+    assert counter.calls == 1
+
+    await asyncio.sleep(0.06)
+    await requests.do("0x789", counter.fetch)
+    assert counter.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_but_not_kept() -> None:
+    """Test that every waiter gets the error and the next call retries."""
+    requests = SingleFlight()
+    counter = Counter()
+
+    waiters = [asyncio.create_task(requests.do("0x789", counter.fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    counter.release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError):
+        await requests.do("0x789", counter.fail)
+    assert counter.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others() -> None:
+    """Test that cancelling one caller leaves the shared work running."""
+    requests = SingleFlight()
+    counter = Counter()
+
+    cancelled = asyncio.create_task(requests.do("0x789", counter.fetch))
+    waiter = asyncio.create_task(requests.do("0x789", counter.fetch))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    counter.release.set()
+
+    assert await waiter == "block"
+    assert cancelled.cancelled()
+    assert counter.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_forget_drops_running_flight() -> None:
+    """Test that a flight forgotten while running is neither reused nor cached."""
+    requests = SingleFlight()
+    counter = Counter()
+
+    stale = asyncio.create_task(requests.do("0x789", counter.fetch))
+    await asyncio.sleep(0)
+    requests.forget("0x789")
+    fresh = asyncio.create_task(requests.do("0x789", counter.fetch))
+    await asyncio.sleep(0)
+    counter.release.set()
+
+    assert await stale == "block"
+    assert await fresh == "block"
+    assert counter.calls == 2
+    await requests.do("0x789", counter.fetch)
+    assert counter.calls == 2  # Only the fresh flight's result is kept
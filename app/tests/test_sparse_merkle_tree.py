@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from blockchain.sparse_merkle_tree import SparseMerkleTree
+from tests.mocks import MockKeyDBClient
+
+
+@pytest.fixture
+def state_tree() -> SparseMerkleTree:
+    return SparseMerkleTree(MockKeyDBClient())
+
+
+@pytest.mark.asyncio
+async def test_empty_tree_root(state_tree: SparseMerkleTree) -> None:
+    """Test that an empty tree has the empty subtree hash as root."""
+    assert state_tree.root == SparseMerkleTree.EMPTY_HASHES[SparseMerkleTree.DEPTH]
+    assert await state_tree.get("0xsender1") is None
+
+
+@pytest.mark.asyncio
+async def test_update_and_get(state_tree: SparseMerkleTree) -> None:
+    """Test storing and retrieving account values."""
+    root = await state_tree.update({"0xsender1": "10", "0xreceiver1": "5"})
+
+    assert root == state_tree.root
+    assert await state_tree.get("0xsender1") == "10"
+    assert await state_tree.get("0xreceiver1") == "5"
+    assert await state_tree.get("0xunknown") is None
+
+
+@pytest.mark.asyncio
+async def test_root_is_independent_of_update_order() -> None:
+    """Test that batched and one-by-one updates produce the same root."""
+    batched = SparseMerkleTree(MockKeyDBClient())
+    sequential = SparseMerkleTree(MockKeyDBClient())
+    accounts = {f"0x{i}": str(i) for i in range(20)}
+
+    await batched.update(accounts)
+    for address, value in reversed(accounts.items()):
+        await sequential.update({address: value})
+
+    assert batched.root == sequential.root
+
+
+@pytest.mark.asyncio
+async def test_removing_accounts_restores_root(state_tree: SparseMerkleTree) -> None:
+    """Test that removing accounts brings back the previous root."""
+    await state_tree.update({"0xsender1": "10"})
+    root = state_tree.root
+
+    await state_tree.update({"0xsender2": "3", "0xsender3": "4"})
+    await state_tree.update({"0xsender2": None, "0xsender3": None})
+
+    assert state_tree.root == root
+
+
+@pytest.mark.asyncio
+async def test_inclusion_proof(state_tree: SparseMerkleTree) -> None:
+    """Test generating and verifying an inclusion proof."""
+    await state_tree.update({f"0x{i}": str(i) for i in range(10)})
+
+    value, siblings, bitmap, root = await state_tree.get_proof("0x3")
+
+    assert value == "3"
+    assert root == state_tree.root
+    assert len(siblings) < 10  # Only non-empty siblings are included
+    assert SparseMerkleTree.verify_proof("0x3", value, siblings, bitmap, state_tree.root) is True
+    assert SparseMerkleTree.verify_proof("0x3", "4", siblings, bitmap, state_tree.root) is False
+
+
+@pytest.mark.asyncio
+async def test_non_inclusion_proof(state_tree: SparseMerkleTree) -> None:
+    """Test generating and verifying a non-inclusion proof."""
+    await state_tree.update({f"0x{i}": str(i) for i in range(10)})
+
+    value, siblings, bitmap, root = await state_tree.get_proof("0xunknown")
+
+    assert value is None
+    assert SparseMerkleTree.verify_proof("0xunknown", None, siblings, bitmap, state_tree.root) is True
+    assert SparseMerkleTree.verify_proof("0xunknown", "1", siblings, bitmap, state_tree.root) is False
+
+
+@pytest.mark.asyncio
+async def test_reload_from_storage() -> None:
+    """Test that a tree can be reopened from KeyDB with only its root."""
+    db = MockKeyDBClient()
+    state_tree = SparseMerkleTree(db)
+    await state_tree.update({f"0x{i}": str(i) for i in range(10)})
+
+    reopened = SparseMerkleTree(db, root=state_tree.root, cache_size=1)
+
+    for i in range(10):
+        assert await reopened.get(f"0x{i}") == str(i)
+
+
+@pytest.mark.asyncio
+async def test_replaced_nodes_are_pruned() -> None:
+    """Test that only nodes of the latest state stay in KeyDB."""
+    db = MockKeyDBClient()
+    state_tree = SparseMerkleTree(db)
+    accounts = {f"0x{i}": str(i) for i in range(20)}
+    await state_tree.update(accounts)
+    for step in range(10):
+        changes: dict[str, str | None] = {f"0x{i}": str(step * i) for i in range(0, 20, 3)}
+        changes[f"0x{step}"] = None
+        await state_tree.update(changes)
+        accounts.update({address: value for address, value in changes.items() if value is not None})
+        accounts.pop(f"0x{step}")
+
+    fresh_db = MockKeyDBClient()
+    fresh = SparseMerkleTree(fresh_db)
+    await fresh.update(dict(accounts))
+
+    assert state_tree.root == fresh.root
+    assert db.store.keys() == fresh_db.store.keys()
+
+
+@pytest.mark.asyncio
+async def test_update_writes_in_one_batch() -> None:
+    """Test that an update makes a single write call however many nodes change."""
+    db = MockKeyDBClient()
+    state_tree = SparseMerkleTree(db)
+    await state_tree.update({f"0x{i}": str(i) for i in range(20)})
+    writes = []
+    mset = db.mset
+
+    async def counting_mset(mapping: dict[str, str]) -> bool:
+        writes.append(len(mapping))
+        return await mset(mapping)
+
+    db.mset = counting_mset
+    await state_tree.update({f"0x{i}": "0" for i in range(10)})
+
+    assert len(writes) == 1
+    assert writes[0] > 10
+
+
+@pytest.mark.asyncio
+async def test_proof_during_update() -> None:
+    """Test that a proof overlapping an update verifies against the root it returns."""
+    db = MockKeyDBClient()
+    writer = SparseMerkleTree(db)
+    await writer.update({f"0x{i}": str(i) for i in range(20)})
+    state_tree = SparseMerkleTree(db, root=writer.root, cache_size=0)
+    paused, resume = asyncio.Event(), asyncio.Event()
+    get = db.get
+
+    async def slow_get(key: str, immutable: bool = False) -> str | None:
+        paused.set()
+        await resume.wait()
+        return await get(key, immutable)
+
+    db.get = slow_get
+    proof = asyncio.create_task(state_tree.get_proof("0x3"))
+    await paused.wait()
+    db.get = get
+    await state_tree.update({"0x3": "30", "0x4": None})
+    resume.set()
+
+    value, siblings, bitmap, root = await proof
+    assert SparseMerkleTree.verify_proof("0x3", value, siblings, bitmap, root) is True
+    # The nodes of the old root were pruned, so the proof moved on to the new one
+    assert (value, root) == ("30", state_tree.root)